@@ -4,17 +4,26 @@
 Constants for the coal self-ignition prediction app.
 """
 
-import os
+from pathlib import Path
 
 # Data directory
-DATA_DIR = "data"
-DATA_WEATHER_DIR = "data/weather_data"
+DATA_DIR = Path("data")
+DATA_WEATHER_DIR = DATA_DIR / "weather_data"
 
 # File paths
-FIRE_FILE = os.path.join(DATA_DIR, "fires", "fires.csv")
-SUPPLIES_FILE = os.path.join(DATA_DIR, "supplies", "supplies.csv")
-TEMP_FILE = os.path.join(DATA_DIR, "temperature", "temperature.csv")
-WEATHER_DIR = os.path.join(DATA_DIR, "weather_data")
+FIRE_FILE = DATA_DIR / "fires" / "fires.csv"
+SUPPLIES_FILE = DATA_DIR / "supplies" / "supplies.csv"
+TEMP_FILE = DATA_DIR / "temperature" / "temperature.csv"
+WEATHER_DIR = DATA_DIR / "weather_data"
+
+# Parquet copies of the weather CSV files (rebuilt automatically)
+WEATHER_CACHE_DIR = DATA_DIR / "cache" / "weather"
 
 # Schedule file
-SCHEDULE_FILE = "schedule.json"
+SCHEDULE_FILE = Path("schedule.json")
+
+# Application stylesheet injected by render_header
+STYLE_FILE = Path("static") / "app.css"
+
+# Chunk size for streaming uploaded files to disk (1 MiB)
+UPLOAD_CHUNK_SIZE = 1024 * 1024
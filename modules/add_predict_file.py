@@ -6,7 +6,9 @@ Handles UI and logic for uploading a CSV file for ML prediction.
 import streamlit as st
 import pandas as pd
 import os
+import shutil
 from .logger import get_app_logger
+from constants import UPLOAD_CHUNK_SIZE
 
 logger = get_app_logger()
 
@@ -47,10 +49,12 @@ def handle_predict_file_upload():
     if uploaded_file is not None:
         try:
             logger.info(f"Начата обработка загруженного файла: {uploaded_file.name}")
-            df = pd.read_csv(uploaded_file)
-            logger.info(f"Файл загружен: {df.shape[0]} строк, {df.shape[1]} колонок")
+            # Читаем только заголовки: полный файл будет прочитан на этапе прогноза
+            header = pd.read_csv(uploaded_file, nrows=0)
+            logger.info(f"Заголовок файла прочитан: {header.shape[1]} колонок")
 
-            missing_cols = [col for col in PREDICT_REQUIRED_COLUMNS if col not in df.columns]
+            header_cols = set(header.columns)
+            missing_cols = [col for col in PREDICT_REQUIRED_COLUMNS if col not in header_cols]
             if missing_cols:
                 error_msg = f"Отсутствуют обязательные колонки: {missing_cols}"
                 logger.warning(error_msg)
@@ -58,8 +62,9 @@ def handle_predict_file_upload():
                 return
 
             os.makedirs("data", exist_ok=True)
+            uploaded_file.seek(0)
             with open(PREDICT_FILE_PATH, "wb") as f:
-                f.write(uploaded_file.getbuffer())
+                shutil.copyfileobj(uploaded_file, f, length=UPLOAD_CHUNK_SIZE)
             logger.info(f"Файл успешно сохранён: {PREDICT_FILE_PATH}")
 
             st.success(f"Файл успешно сохранён: `{PREDICT_FILE_PATH}`")
@@ -1,17 +1,18 @@
 # modules/add_weather_file.py
 
+import csv
+import shutil
 import streamlit as st
-import pandas as pd
-from pathlib import Path
 from .logger import get_app_logger
-from constants import DATA_WEATHER_DIR
+from constants import DATA_WEATHER_DIR, UPLOAD_CHUNK_SIZE
 
 logger = get_app_logger()
 
-REQUIRED_COLUMNS = {
+REQUIRED_COLUMNS = frozenset({
     "date", "t", "p", "humidity", "precipitation",
     "wind_dir", "v_avg", "v_max", "cloudcover", "visibility", "weather_code"
-}
+})
+REQUIRED_COLUMNS_SORTED = tuple(sorted(REQUIRED_COLUMNS))
 
 
 def handle_add_weather_file():
@@ -35,7 +36,7 @@ def handle_add_weather_file():
     - On successful upload and validation, saves the file and shows a success message.
     - On failure (wrong type, missing columns, I/O error), shows an appropriate warning/error.
     """
-    weather_data_dir = Path(DATA_WEATHER_DIR)
+    weather_data_dir = DATA_WEATHER_DIR
     weather_data_dir.mkdir(parents=True, exist_ok=True)
 
     st.subheader("Загрузка нового файла погоды")
@@ -63,21 +64,28 @@ def handle_add_weather_file():
         try:
             logger.info(f"Начата валидация файла погоды: {filename}")
 
-            # Читаем только заголовки
-            df = pd.read_csv(uploaded_file, nrows=0)
-            actual_columns = set(df.columns)
+            # Читаем только строку заголовков
+            header_line = uploaded_file.readline().decode("utf-8-sig").rstrip("\r\n")
+            if not header_line.strip():
+                error_msg = "Загружен пустой CSV-файл"
+                logger.error(error_msg)
+                st.error("Файл пуст. Загрузите корректный CSV-файл с данными.")
+                return
+
+            actual_columns = set(next(csv.reader([header_line])))
             missing_columns = REQUIRED_COLUMNS - actual_columns
 
             if missing_columns:
-                error_msg = f"Файл '{filename}' не содержит обязательные столбцы: {sorted(missing_columns)}"
+                missing_sorted = sorted(missing_columns)
+                error_msg = f"Файл '{filename}' не содержит обязательные столбцы: {missing_sorted}"
                 logger.warning(error_msg)
                 st.error(
                     "Файл не содержит все обязательные столбцы.\n\n"
                     "**Отсутствующие параметры:**\n"
-                    + "\n".join(f"- `{col}`" for col in sorted(missing_columns))
+                    + "\n".join(f"- `{col}`" for col in missing_sorted)
                 )
                 st.info(
-                    "Обязательные столбцы: " + ", ".join(f"`{c}`" for c in sorted(REQUIRED_COLUMNS))
+                    "Обязательные столбцы: " + ", ".join(f"`{c}`" for c in REQUIRED_COLUMNS_SORTED)
                 )
                 return
 
@@ -85,7 +93,7 @@ def handle_add_weather_file():
             file_path = weather_data_dir / filename
             uploaded_file.seek(0)
             with open(file_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
+                shutil.copyfileobj(uploaded_file, f, length=UPLOAD_CHUNK_SIZE)
 
             success_msg = f"Файл погоды '{filename}' успешно сохранён в {weather_data_dir}"
             logger.info(success_msg)
@@ -94,11 +102,7 @@ def handle_add_weather_file():
             if "show_upload_weather" in st.session_state:
                 st.session_state.show_upload_weather = False
 
-        except pd.errors.EmptyDataError:
-            error_msg = "Загружен пустой CSV-файл"
-            logger.error(error_msg)
-            st.error("Файл пуст. Загрузите корректный CSV-файл с данными.")
-        except pd.errors.ParserError as e:
+        except csv.Error as e:
             error_msg = f"Ошибка парсинга CSV ({filename}): {e}"
             logger.error(error_msg, exc_info=True)
             st.error(f"Ошибка при разборе CSV: {str(e)}")
@@ -7,8 +7,9 @@ All UI text is in Russian.
 import streamlit as st
 import os
 import pandas as pd
+from pathlib import Path
 from .logger import get_app_logger  # ← относительный импорт логгера
-from .data_loader import load_csv
+from .data_loader import load_csv_schema, load_date_candidates, list_weather_years
 from .schedule_manager import save_schedule
 from constants import FIRE_FILE, SUPPLIES_FILE, TEMP_FILE, WEATHER_DIR
 
@@ -16,7 +17,7 @@ from constants import FIRE_FILE, SUPPLIES_FILE, TEMP_FILE, WEATHER_DIR
 logger = get_app_logger()
 
 
-def _setup_standard_form(category: str, file_path: str, df_preview: pd.DataFrame, default_y_cols: list):
+def _setup_standard_form(category: str, file_path: Path, df_preview: pd.DataFrame, default_y_cols: list):
     """
     Renders a standard configuration form for chart creation.
 
@@ -26,9 +27,7 @@ def _setup_standard_form(category: str, file_path: str, df_preview: pd.DataFrame
     @param default_y_cols: Suggested default columns for Y-axis.
     @return: None
     """
-    date_candidates = [col for col in df_preview.columns if "дата" in col.lower() or "date" in col.lower()]
-    if not date_candidates:
-        date_candidates = df_preview.select_dtypes(include=["object", "datetime"]).columns.tolist()
+    date_candidates = load_date_candidates(file_path)
 
     date_col = st.selectbox("Колонка с датой", date_candidates, key=f"date_{category}")
     value_cols = [col for col in df_preview.columns if col != date_col]
@@ -40,7 +39,7 @@ def _setup_standard_form(category: str, file_path: str, df_preview: pd.DataFrame
     y_cols = st.multiselect("Параметры (ось Y)", value_cols, default=safe_defaults, key=f"ycols_{category}")
 
     params_str = "_".join(y_cols[:3]) if y_cols else "без_параметров"
-    auto_name = f"{os.path.splitext(os.path.basename(file_path))[0]}_{params_str}"
+    auto_name = f"{file_path.stem}_{params_str}"
     custom_name = st.text_input("Название графика", key=f"name_{category}")
     st.caption(f"Если оставить пустым, будет использовано: `{auto_name}`")
     display_name = custom_name.strip() if custom_name.strip() else auto_name
@@ -53,16 +52,17 @@ def _setup_standard_form(category: str, file_path: str, df_preview: pd.DataFrame
         try:
             new_chart = {
                 "id": st.session_state.next_id,
-                "file": file_path,
+                "file": file_path.as_posix(),
                 "date_col": date_col,
                 "y_cols": y_cols,
                 "days": days,
                 "plot_type": plot_type,
                 "title": display_name
             }
-            st.session_state.graphs[category].append(new_chart)
+            st.session_state.graphs[category][new_chart["id"]] = new_chart
             st.session_state.next_id += 1
-            _persist_changes()
+            st.session_state.total_graphs += 1
+            _mark_dirty()
             logger.info(f"Создан график: категория='{category}', название='{display_name}', параметры={y_cols}")
             st.rerun()
         except Exception as e:
@@ -74,16 +74,27 @@ def _setup_standard_form(category: str, file_path: str, df_preview: pd.DataFrame
         st.rerun()
 
 
+def _mark_dirty():
+    """Marks graph configuration as changed; it is saved once at the end of the script run."""
+    st.session_state.schedule_dirty = True
+
+
+def flush_pending_changes():
+    """Saves graph configuration to schedule.json if it was changed since the last save."""
+    if st.session_state.get("schedule_dirty"):
+        _persist_changes()
+        st.session_state.schedule_dirty = False
+
+
 def _persist_changes():
     """Saves current graph configuration to schedule.json."""
     try:
+        # Graphs are kept as {id: config} in the session and stored as lists
         data_to_save = {
-            "supplies": st.session_state.graphs["supplies"],
-            "fires": st.session_state.graphs["fires"],
-            "temperature": st.session_state.graphs["temperature"],
-            "weather": st.session_state.graphs["weather"],
-            "next_id": st.session_state.next_id
+            category: list(graphs.values())
+            for category, graphs in st.session_state.graphs.items()
         }
+        data_to_save["next_id"] = st.session_state.next_id
         save_schedule(data_to_save)
         logger.debug("Конфигурация графиков сохранена в schedule.json")
     except Exception as e:
@@ -97,7 +108,7 @@ def _persist_changes():
 @st.dialog("Настройка: Выгрузка и отгрузка")
 def show_supplies_dialog():
     try:
-        df_preview = load_csv(SUPPLIES_FILE)
+        df_preview = load_csv_schema(SUPPLIES_FILE)
         if df_preview.empty:
             st.error("Не удалось загрузить файл supplies.csv")
             logger.warning("Файл supplies.csv пуст или не загружен")
@@ -112,7 +123,7 @@ def show_supplies_dialog():
 @st.dialog("Настройка: Информация о самовозгораниях")
 def show_fires_dialog():
     try:
-        df_preview = load_csv(FIRE_FILE)
+        df_preview = load_csv_schema(FIRE_FILE)
         if df_preview.empty:
             st.error("Не удалось загрузить файл fires.csv")
             logger.warning("Файл fires.csv пуст или не загружен")
@@ -129,7 +140,7 @@ def show_fires_dialog():
 @st.dialog("Настройка: Показатели температуры в штабелях")
 def show_temperature_dialog():
     try:
-        df_preview = load_csv(TEMP_FILE)
+        df_preview = load_csv_schema(TEMP_FILE)
         if df_preview.empty:
             st.error("Не удалось загрузить файл temperature.csv")
             logger.warning("Файл temperature.csv пуст или не загружен")
@@ -149,39 +160,23 @@ def show_weather_dialog():
             logger.error(f"Папка WEATHER_DIR не существует: {WEATHER_DIR}")
             return
 
-        weather_files = [f for f in os.listdir(WEATHER_DIR) if f.endswith(".csv")]
-        if not weather_files:
-            st.error("Папка weather_data пуста")
-            logger.warning("Папка weather_data пуста")
-            return
-
-        years = []
-        for f in weather_files:
-            try:
-                year = int(f.replace("weather_data_", "").replace(".csv", ""))
-                years.append(year)
-            except ValueError:
-                continue
-
+        years = list_weather_years(WEATHER_DIR)
         if not years:
             st.error("Не найдено файлов в формате weather_data_YYYY.csv")
             logger.warning("Нет файлов weather_data_*.csv с корректным годом")
             return
 
-        years = sorted(set(years))
         selected_year = st.selectbox("Выберите год", years, key="year_weather_select")
         selected_file = f"weather_data_{selected_year}.csv"
-        file_path = os.path.join(WEATHER_DIR, selected_file)
+        file_path = WEATHER_DIR / selected_file
 
-        df_preview = load_csv(file_path)
+        df_preview = load_csv_schema(file_path)
         if df_preview.empty:
             st.error(f"Не удалось загрузить {selected_file}")
             logger.warning(f"Файл {selected_file} пуст или не загружен")
             return
 
-        date_candidates = [col for col in df_preview.columns if "дата" in col.lower() or "date" in col.lower()]
-        if not date_candidates:
-            date_candidates = df_preview.select_dtypes(include=["object", "datetime"]).columns.tolist()
+        date_candidates = load_date_candidates(file_path)
 
         date_col = st.selectbox("Колонка с датой", date_candidates, key="date_weather")
         value_cols = [col for col in df_preview.columns if col != date_col]
@@ -194,7 +189,7 @@ def show_weather_dialog():
         y_cols = st.multiselect("Параметры (ось Y)", value_cols, default=safe_defaults, key="ycols_weather")
 
         params_str = "_".join(y_cols[:3]) if y_cols else "без_параметров"
-        auto_name = f"{os.path.splitext(selected_file)[0]}_{params_str}"
+        auto_name = f"{file_path.stem}_{params_str}"
         custom_name = st.text_input("Название графика", key="name_weather")
         st.caption(f"Если оставить пустым, будет использовано: `{auto_name}`")
         display_name = custom_name.strip() if custom_name.strip() else auto_name
@@ -207,16 +202,17 @@ def show_weather_dialog():
             try:
                 new_chart = {
                     "id": st.session_state.next_id,
-                    "file": file_path,
+                    "file": file_path.as_posix(),
                     "date_col": date_col,
                     "y_cols": y_cols,
                     "days": days,
                     "plot_type": plot_type,
                     "title": display_name
                 }
-                st.session_state.graphs["weather"].append(new_chart)
+                st.session_state.graphs["weather"][new_chart["id"]] = new_chart
                 st.session_state.next_id += 1
-                _persist_changes()
+                st.session_state.total_graphs += 1
+                _mark_dirty()
                 logger.info(f"Создан график погоды: год={selected_year}, название='{display_name}', параметры={y_cols}")
                 st.rerun()
             except Exception as e:
@@ -3,27 +3,296 @@
 Module for loading and preprocessing CSV data.
 """
 
+import os
+import re
+from collections import deque
 import streamlit as st
 import pandas as pd
+from pandas.tseries.api import guess_datetime_format
 from .logger import get_app_logger
+from constants import WEATHER_DIR, WEATHER_CACHE_DIR
 
 logger = get_app_logger()
 
-def load_csv(file_path):
+# Number of rows sampled by load_csv_schema for dtype inference
+SCHEMA_SAMPLE_ROWS = 200
+
+# Chunk size used by load_csv_tail when streaming a CSV file
+TAIL_CHUNK_ROWS = 100_000
+
+# Weather file name pattern: weather_data_YYYY.csv
+WEATHER_FILE_RE = re.compile(r"^weather_data_(\d{4})\.csv$")
+
+def get_mtime(file_path):
+    """
+    Returns the modification time of a file, used as a cache key.
+
+    @param file_path: Path to the file.
+    @return: Modification time or None if the file does not exist.
+    """
+    try:
+        return os.path.getmtime(file_path)
+    except OSError:
+        return None
+
+
+def detect_date_cols(columns):
+    """
+    Returns the columns whose names look like dates ("дата" / "date").
+
+    @param columns: Column names (pd.Index or any iterable of strings).
+    @return: List of date column names.
+    """
+    columns = pd.Index(columns)
+    mask = columns.str.lower().str.contains("дата|date", regex=True)
+    return columns[mask].tolist()
+
+
+def read_csv_fast(file_path, **kwargs):
+    """
+    Reads a whole CSV file with the multithreaded PyArrow engine.
+    Falls back to the default pandas parser if PyArrow is not installed.
+
+    @param file_path: Path (or buffer) of the CSV file to read.
+    @param kwargs: Extra arguments passed to pd.read_csv.
+    @return: Loaded DataFrame.
+    """
+    try:
+        return pd.read_csv(file_path, engine="pyarrow", **kwargs)
+    except ImportError:
+        logger.debug("PyArrow недоступен, используется стандартный парсер CSV")
+        return pd.read_csv(file_path, **kwargs)
+
+
+def scan_weather_files(dir_path):
+    """
+    Scans a directory for weather_data_YYYY.csv files in a single os.scandir pass.
+
+    @param dir_path: Path to the weather data directory.
+    @return: List of (year, file path) tuples sorted by year.
+    """
+    with os.scandir(dir_path) as entries:
+        return sorted(
+            (int(match.group(1)), entry.path)
+            for entry in entries
+            if (match := WEATHER_FILE_RE.match(entry.name))
+        )
+
+
+def list_weather_years(dir_path):
+    """
+    Returns the years of all weather_data_YYYY.csv files in a directory.
+    Results are cached and invalidated when the directory contents change.
+
+    @param dir_path: Path to the weather data directory.
+    @return: Sorted list of years (empty if the directory is missing).
+    """
+    return _list_weather_years_cached(dir_path, get_mtime(dir_path))
+
+
+@st.cache_data(show_spinner=False)
+def _list_weather_years_cached(dir_path, mtime):
+    """
+    Cached implementation of list_weather_years.
+
+    @param dir_path: Path to the weather data directory.
+    @param mtime: Directory modification time (cache invalidation key).
+    @return: Sorted list of years.
+    """
+    if mtime is None:
+        return []
+    years = [year for year, _ in scan_weather_files(dir_path)]
+    logger.debug("Обнаружены годы метеоданных в %s: %s", dir_path, years)
+    return years
+
+
+def load_weather_year(year):
+    """
+    Loads the weather data of one year.
+    A Parquet copy of weather_data_YYYY.csv is kept in WEATHER_CACHE_DIR and
+    rebuilt whenever the CSV file is newer, so the CSV is parsed only once.
+
+    @param year: Year of the weather file.
+    @return: Loaded DataFrame or empty DataFrame on failure.
+    """
+    csv_path = WEATHER_DIR / f"weather_data_{year}.csv"
+    return _load_weather_year_cached(year, get_mtime(csv_path))
+
+
+@st.cache_data(show_spinner=False)
+def _load_weather_year_cached(year, mtime):
+    """
+    Cached implementation of load_weather_year.
+
+    @param year: Year of the weather file.
+    @param mtime: CSV file modification time (cache invalidation key).
+    @return: Loaded DataFrame or empty DataFrame on failure.
+    """
+    csv_path = WEATHER_DIR / f"weather_data_{year}.csv"
+    parquet_path = WEATHER_CACHE_DIR / f"weather_data_{year}.parquet"
+
+    parquet_mtime = get_mtime(parquet_path)
+    if mtime is not None and parquet_mtime is not None and parquet_mtime >= mtime:
+        try:
+            df = pd.read_parquet(parquet_path)
+            logger.debug("Метеоданные за %s г. загружены из %s", year, parquet_path)
+            return df
+        except Exception as e:
+            logger.warning(f"Не удалось прочитать {parquet_path}, используется CSV: {e}")
+
+    df = _load_csv_cached(csv_path, mtime)
+    if not df.empty:
+        try:
+            WEATHER_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            df.to_parquet(parquet_path, index=False)
+            logger.debug("Создана Parquet-копия метеоданных: %s", parquet_path)
+        except Exception as e:
+            logger.warning(f"Не удалось сохранить Parquet-копию {parquet_path}: {e}")
+    return df
+
+
+def load_csv_schema(file_path):
+    """
+    Loads only the header and a small sample of rows from a CSV file.
+    Intended for configuration forms that need column names and dtypes only.
+
+    @param file_path: Path to the CSV file to load.
+    @return: Sample DataFrame or empty DataFrame on failure.
+    """
+    return _load_csv_cached(file_path, get_mtime(file_path), nrows=SCHEMA_SAMPLE_ROWS)
+
+
+def load_date_candidates(file_path):
+    """
+    Returns the columns of a CSV file that can serve as the date axis:
+    columns named like dates, otherwise object/datetime columns of the schema sample.
+    Results are cached and invalidated when the file changes.
+
+    @param file_path: Path to the CSV file.
+    @return: List of candidate date column names.
+    """
+    return _date_candidates_cached(file_path, get_mtime(file_path))
+
+
+@st.cache_data(show_spinner=False)
+def _date_candidates_cached(file_path, mtime):
+    """
+    Cached implementation of load_date_candidates.
+
+    @param file_path: Path to the CSV file.
+    @param mtime: File modification time (cache invalidation key).
+    @return: List of candidate date column names.
+    """
+    df = _load_csv_cached(file_path, mtime, nrows=SCHEMA_SAMPLE_ROWS)
+    candidates = detect_date_cols(df.columns)
+    if not candidates:
+        candidates = df.select_dtypes(include=["object", "datetime"]).columns.tolist()
+    return candidates
+
+
+def load_csv_tail(file_path, days, date_col):
+    """
+    Loads only the rows of a CSV file that fall within the last `days` days.
+    The file is streamed in chunks, so older data is never held in memory at once.
+
+    @param file_path: Path to the CSV file to load.
+    @param days: Number of days (counted back from the latest date) to keep.
+    @param date_col: Name of the date column.
+    @return: Loaded DataFrame or empty DataFrame on failure.
+    """
+    return _load_csv_cached(file_path, get_mtime(file_path), tail_days=days, tail_date_col=date_col)
+
+
+def _read_csv_tail(file_path, days, date_col):
+    """
+    Reads a CSV file chunk by chunk, dropping chunks older than the lookback window.
+
+    @param file_path: Path to the CSV file to read.
+    @param days: Number of days to keep.
+    @param date_col: Name of the date column.
+    @return: DataFrame with the rows of the lookback window.
+    """
+    kept = deque()
+    max_date = pd.NaT
+    # Date format, guessed once from the first non-null value so that every chunk is parsed alike
+    fmt = None
+    fmt_known = False
+    for chunk in pd.read_csv(file_path, chunksize=TAIL_CHUNK_ROWS):
+        kept.append(chunk)
+        if date_col not in chunk.columns:
+            continue
+
+        if not fmt_known:
+            values = chunk[date_col].dropna()
+            if values.empty:
+                continue
+            first = values.iloc[0]
+            fmt = guess_datetime_format(first) if isinstance(first, str) else None
+            fmt_known = True
+            if fmt is not None:
+                # Earlier chunks hold no dates at all; they only need the datetime dtype
+                for prev in list(kept)[:-1]:
+                    prev[date_col] = pd.to_datetime(prev[date_col], format=fmt, errors='coerce')
+        if fmt is None:
+            # Format cannot be guessed: keep the raw values and parse the whole column once below
+            continue
+
+        chunk[date_col] = pd.to_datetime(chunk[date_col], format=fmt, errors='coerce')
+        chunk_max = chunk[date_col].max()
+        if pd.notna(chunk_max) and (pd.isna(max_date) or chunk_max > max_date):
+            max_date = chunk_max
+        if pd.isna(max_date):
+            continue
+
+        min_date = max_date - pd.Timedelta(days=days)
+        while len(kept) > 1 and not kept[0][date_col].max() >= min_date:
+            kept.popleft()
+
+    if not kept:
+        return pd.read_csv(file_path, nrows=0)
+
+    df = pd.concat(kept, ignore_index=True)
+    if fmt is None and date_col in df.columns:
+        df[date_col] = pd.to_datetime(df[date_col], errors='coerce')
+        max_date = df[date_col].max()
+    if pd.notna(max_date):
+        df = df[df[date_col] >= max_date - pd.Timedelta(days=days)].reset_index(drop=True)
+    return df
+
+
+@st.cache_data(show_spinner=False)
+def _load_csv_cached(file_path, mtime, nrows=None, tail_days=None, tail_date_col=None):
     """
-    Loads a CSV file and attempts to parse date columns.
+    Cached CSV loader shared by load_csv_schema, load_csv_tail and load_weather_year.
 
     @param file_path: Path to the CSV file to load.
+    @param mtime: File modification time (cache invalidation key).
+    @param nrows: Maximum number of rows to read (None — whole file).
+    @param tail_days: If set, keep only the last `tail_days` days (see load_csv_tail).
+    @param tail_date_col: Date column used together with tail_days.
     @return: Loaded DataFrame or empty DataFrame on failure.
     """
     try:
-        df = pd.read_csv(file_path)
-        logger.debug(f"Файл загружен: {file_path} ({df.shape[0]} строк, {df.shape[1]} колонок)")
+        if tail_days is not None and tail_date_col:
+            df = _read_csv_tail(file_path, tail_days, tail_date_col)
+            # Sorted once here, so plot_series can cut its lookback window with a binary search
+            if tail_date_col in df.columns and not df[tail_date_col].is_monotonic_increasing:
+                df = df.sort_values(tail_date_col, kind="stable", ignore_index=True)
+        else:
+            header = pd.read_csv(file_path, nrows=0).columns
+            date_cols = detect_date_cols(header)
+            if nrows is None:
+                df = read_csv_fast(file_path, parse_dates=date_cols)
+            else:
+                # The PyArrow engine does not support nrows
+                df = pd.read_csv(file_path, nrows=nrows, parse_dates=date_cols)
+        logger.debug("Файл загружен: %s (%d строк, %d колонок)", file_path, df.shape[0], df.shape[1])
 
-        for col in df.columns:
-            if "дата" in col.lower() or "date" in col.lower():
+        for col in detect_date_cols(df.columns):
+            # Columns already converted by read_csv(parse_dates=...) need no second pass
+            if not pd.api.types.is_datetime64_any_dtype(df[col]):
                 df[col] = pd.to_datetime(df[col], errors='coerce')
-                logger.debug(f"Колонка '{col}' распознана как дата")
+            logger.debug("Колонка '%s' распознана как дата", col)
 
         return df
 
@@ -1,53 +1,20 @@
 # modules/generate_report.py
 import streamlit as st
 import pandas as pd
+import numpy as np
 import os
+import io
 from datetime import datetime
 from pathlib import Path
 from .logger import get_app_logger
-from .predict import get_predictor
+from .data_loader import read_csv_fast
+from .add_predict_file import PREDICT_REQUIRED_COLUMNS
 
 logger = get_app_logger()
 
-def generate_comprehensive_report():
-    st.subheader("Генерация аналитического отчёта")
-    logger.info("Запущена генерация общего аналитического отчёта")
-    st.info("Общий отчёт по погодным и операционным данным будет реализован позже.")
-
+PREDICTION_REPORT_TEMPLATE = """Аналитический отчет по прогнозу риска самовозгорания угля
 
-def generate_prediction_report(result_df: pd.DataFrame) -> str:
-    total = len(result_df)
-    high_risk = result_df["fire_pred"].sum()
-    max_proba = result_df["fire_proba"].max()
-    mean_proba = result_df["fire_proba"].mean()
-
-    if "Штабель" in result_df.columns:
-        high_risk_stacks = (
-            result_df[result_df["fire_pred"] == 1]
-            .groupby("Штабель")
-            .size()
-            .sort_values(ascending=False)
-            .head(5)
-        )
-        top_stacks_str = ", ".join([f"Штабель {int(s)}" for s in high_risk_stacks.index])
-    else:
-        top_stacks_str = "информация о штабелях недоступна"
-
-    monthly_risk = ""
-    if "month" in result_df.columns:
-        monthly_counts = (
-            result_df[result_df["fire_pred"] == 1]
-            .groupby("month")
-            .size()
-            .sort_values(ascending=False)
-        )
-        if not monthly_counts.empty:
-            peak_month = monthly_counts.index[0]
-            monthly_risk = f"\n- Наибольшее количество рисковых событий прогнозируется в месяце: {peak_month}."
-
-    report = f"""Аналитический отчет по прогнозу риска самовозгорания угля
-
-Дата формирования: {datetime.now().strftime('%d.%m.%Y %H:%M')}
+Дата формирования: {created}
 
 Общая статистика:
 - Всего проанализировано записей: {total}
@@ -56,8 +23,8 @@ def generate_prediction_report(result_df: pd.DataFrame) -> str:
 - Средняя вероятность риска: {mean_proba:.3f}
 
 Ключевые выводы:
-- Доля рисковых записей: {high_risk / total:.1%} от общего объема.
-- Топ-5 штабелей с наибольшим числом рисковых событий: {top_stacks_str}.{monthly_risk}
+- Доля рисковых записей: {risk_share:.1%} от общего объема.
+- Топ-5 штабелей с наибольшим числом рисковых событий: {top_stacks}.{monthly_risk}
 
 Рекомендации:
 - Рекомендуется провести дополнительный температурный мониторинг и/или профилактические мероприятия
@@ -67,7 +34,58 @@ def generate_prediction_report(result_df: pd.DataFrame) -> str:
 
 Отчет сформирован автоматически на основе модели машинного обучения.
 """
-    return report
+
+def generate_comprehensive_report():
+    st.subheader("Генерация аналитического отчёта")
+    logger.info("Запущена генерация общего аналитического отчёта")
+    st.info("Общий отчёт по погодным и операционным данным будет реализован позже.")
+
+
+def summarize_predictions(result_df: pd.DataFrame) -> dict:
+    """
+    Computes the summary statistics of a prediction result in one NumPy pass per column.
+
+    @param result_df: DataFrame with 'fire_proba' and 'fire_pred' columns.
+    @return: Dict with total, high_risk, max_proba, mean_proba and risk_share.
+    """
+    proba = result_df["fire_proba"].to_numpy()
+    pred = result_df["fire_pred"].to_numpy()
+    total = len(pred)
+    high_risk = int(np.count_nonzero(pred))
+    return {
+        "total": total,
+        "high_risk": high_risk,
+        "max_proba": float(proba.max()) if total else float("nan"),
+        "mean_proba": float(proba.mean()) if total else float("nan"),
+        "risk_share": high_risk / total if total else 0.0,
+    }
+
+
+def generate_prediction_report(result_df: pd.DataFrame, summary: dict = None) -> str:
+    if summary is None:
+        summary = summarize_predictions(result_df)
+
+    risk_df = result_df[result_df["fire_pred"].eq(1)]
+
+    if "Штабель" in result_df.columns:
+        high_risk_stacks = risk_df["Штабель"].value_counts().head(5)
+        top_stacks_str = ", ".join([f"Штабель {int(s)}" for s in high_risk_stacks.index])
+    else:
+        top_stacks_str = "информация о штабелях недоступна"
+
+    monthly_risk = ""
+    if "month" in result_df.columns:
+        monthly_counts = risk_df["month"].value_counts()
+        if not monthly_counts.empty:
+            peak_month = monthly_counts.index[0]
+            monthly_risk = f"\n- Наибольшее количество рисковых событий прогнозируется в месяце: {peak_month}."
+
+    return PREDICTION_REPORT_TEMPLATE.format_map({
+        **summary,
+        "created": datetime.now().strftime('%d.%m.%Y %H:%M'),
+        "top_stacks": top_stacks_str,
+        "monthly_risk": monthly_risk,
+    })
 
 
 def run_prediction_and_generate_report():
@@ -76,10 +94,7 @@ def run_prediction_and_generate_report():
 
     schedule_path = os.path.join("data", "schedule_for_prediction.csv")
     output_dir = "output"
-    feature_cols = [
-        "Марка", "Возраст_дн", "mass", "Максимальная температура",
-        "Темп_изменение", "weekday", "month", "t", "p", "humidity"
-    ]
+    feature_cols = PREDICT_REQUIRED_COLUMNS
     threshold = 0.1
 
     if not os.path.exists(schedule_path):
@@ -90,7 +105,10 @@ def run_prediction_and_generate_report():
         return
 
     try:
-        df = pd.read_csv(schedule_path)
+        # Импорт модели откладывается до первого запуска прогноза
+        from .predict import get_predictor
+
+        df = read_csv_fast(schedule_path)
         logger.info(f"Загружен файл прогноза: {df.shape[0]} записей")
 
         predictor = get_predictor()
@@ -99,19 +117,24 @@ def run_prediction_and_generate_report():
 
         os.makedirs(output_dir, exist_ok=True)
         results_path = os.path.join(output_dir, "prediction_results.csv")
-        result_df.to_csv(results_path, index=False, encoding="utf-8")
+        csv_buffer = io.BytesIO()
+        result_df.to_csv(csv_buffer, index=False, encoding="utf-8")
+        csv_data = csv_buffer.getvalue()
+        with open(results_path, "wb") as f:
+            f.write(csv_data)
         logger.info(f"Результаты сохранены: {results_path}")
 
-        report_text = generate_prediction_report(result_df)
+        summary = summarize_predictions(result_df)
+        report_bytes = generate_prediction_report(result_df, summary).encode("utf-8")
         report_path = os.path.join(output_dir, "prediction_report.txt")
-        with open(report_path, "w", encoding="utf-8") as f:
-            f.write(report_text)
+        with open(report_path, "wb") as f:
+            f.write(report_bytes)
         logger.info(f"Аналитический отчёт сохранён: {report_path}")
 
-        total = len(result_df)
-        high_risk = int(result_df["fire_pred"].sum())
-        max_proba = float(result_df["fire_proba"].max())
-        mean_proba = float(result_df["fire_proba"].mean())
+        total = summary["total"]
+        high_risk = summary["high_risk"]
+        max_proba = summary["max_proba"]
+        mean_proba = summary["mean_proba"]
 
         st.success(f"Прогноз завершен: {high_risk} из {total} записей — высокий риск")
         logger.info(f"Прогноз: {high_risk}/{total} записей с высоким риском")
@@ -121,9 +144,8 @@ def run_prediction_and_generate_report():
         col_b.metric("Ср. вероятность", f"{mean_proba:.3f}")
         col_c.metric("Порог классификации", f"{threshold:.2f}")
 
-        csv_data = result_df.to_csv(index=False).encode("utf-8")
         st.download_button("Скачать результаты (CSV)", csv_data, "prediction_results.csv", "text/csv")
-        st.download_button("Скачать аналитический отчет (TXT)", report_text.encode("utf-8"), "prediction_report.txt", "text/plain")
+        st.download_button("Скачать аналитический отчет (TXT)", report_bytes, "prediction_report.txt", "text/plain")
 
         st.write("Первые 10 записей:")
         st.dataframe(result_df.head(10))
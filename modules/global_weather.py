@@ -7,16 +7,77 @@ All UI text is in Russian.
 
 import streamlit as st
 import os
-import glob
 import pandas as pd
 import plotly.express as px
 from datetime import timedelta
 from .logger import get_app_logger
-from .data_loader import load_csv
+from .data_loader import load_weather_year, get_mtime, list_weather_years
 from constants import WEATHER_DIR
 
 logger = get_app_logger()
 
+@st.cache_data(show_spinner=False)
+def _load_combined_weather(years, mtimes):
+    """
+    Loads the weather data of the selected years and combines it into one DataFrame
+    with 'Год' and 'ДеньМесяц' keys for day-of-year averaging.
+
+    @param years: Tuple of years to load.
+    @param mtimes: Tuple of the corresponding file modification times (cache key).
+    @return: Combined DataFrame or empty DataFrame if no year has valid data.
+    """
+    all_dfs = []
+    for year in years:
+        df = load_weather_year(year)
+        if not df.empty and "date" in df.columns:
+            df["date"] = pd.to_datetime(df["date"], errors="coerce")
+            df = df.dropna(subset=["date"])
+            df["Год"] = str(year)
+            df["ДеньМесяц"] = df["date"].dt.strftime("%m-%d")
+            all_dfs.append(df)
+            logger.debug("Загружены метеоданные за %s г. (%d записей)", year, len(df))
+        else:
+            warning_msg = f"Данные за {year} г. недоступны или отсутствует колонка 'date'"
+            logger.warning(warning_msg)
+            st.warning(f"Данные за {year} г. недоступны")
+
+    if not all_dfs:
+        return pd.DataFrame()
+    return pd.concat(all_dfs, ignore_index=True)
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _build_daily_averages(years, mtimes, y_cols, _combined_df):
+    """
+    Averages the selected parameters by day of year for every selected year.
+
+    @param years: Tuple of years to include.
+    @param mtimes: Tuple of the corresponding file modification times (cache key).
+    @param y_cols: Tuple of parameter columns to average.
+    @param _combined_df: Result of _load_combined_weather(years, mtimes); passed in (not hashed)
+                         so that its warnings are not replayed a second time by this cache.
+    @return: Long-format DataFrame (ДеньМесяц, Значение, Год, Параметр, Дата) sorted by date,
+             or empty DataFrame if there is nothing to plot.
+    """
+    if _combined_df.empty:
+        return pd.DataFrame()
+
+    # One grouping pass over all years and parameters, then reshape to long format
+    daily_avg = (
+        _combined_df
+        .groupby(["Год", "ДеньМесяц"], sort=False, observed=True)[list(y_cols)]
+        .mean()
+        .reset_index()
+    )
+    final_df = daily_avg.melt(
+        id_vars=["Год", "ДеньМесяц"],
+        var_name="Параметр",
+        value_name="Значение"
+    )
+    final_df["Дата"] = pd.to_datetime("2020-" + final_df["ДеньМесяц"], errors="coerce")
+    return final_df.dropna(subset=["Дата"]).sort_values("Дата")
+
+
 def render_global_weather():
     """
     Renders the global weather section with year selection, parameter choice,
@@ -34,31 +95,14 @@ def render_global_weather():
         st.error(error_msg)
         return
 
-    # Scan for weather files
-    weather_files = glob.glob(os.path.join(WEATHER_DIR, "weather_data_*.csv"))
-    if not weather_files:
-        logger.info("Файлы метеоданных отсутствуют")
-        st.info("Нет файлов метеоданных")
-        return
-
-    # Extract years from filenames
-    years = []
-    for f in weather_files:
-        basename = os.path.basename(f)
-        try:
-            year = int(basename.replace("weather_data_", "").replace(".csv", ""))
-            years.append(year)
-        except ValueError:
-            logger.debug(f"Пропущен файл с некорректным именем: {basename}")
-            continue
-
+    # Scan for weather_data_YYYY.csv files
+    years = list_weather_years(WEATHER_DIR)
     if not years:
         logger.warning("Не найдено файлов в формате weather_data_YYYY.csv")
         st.info("Не найдено файлов в формате weather_data_YYYY.csv")
         return
 
-    years = sorted(set(years), reverse=False)
-    logger.debug(f"Обнаружены годы метеоданных: {years}")
+    logger.debug("Обнаружены годы метеоданных: %s", years)
 
     # UI Controls
     with st.container():
@@ -88,28 +132,15 @@ def render_global_weather():
             return
 
         # Load and preprocess data
-        all_dfs = []
-        for year in selected_years:
-            file_path = os.path.join(WEATHER_DIR, f"weather_data_{year}.csv")
-            df = load_csv(file_path)
-            if not df.empty and "date" in df.columns:
-                df["date"] = pd.to_datetime(df["date"], errors="coerce")
-                df = df.dropna(subset=["date"])
-                df["Год"] = str(year)
-                df["ДеньМесяц"] = df["date"].dt.strftime("%m-%d")
-                all_dfs.append(df)
-                logger.debug(f"Загружены метеоданные за {year} г. ({len(df)} записей)")
-            else:
-                warning_msg = f"Данные за {year} г. недоступны или отсутствует колонка 'date'"
-                logger.warning(warning_msg)
-                st.warning(f"Данные за {year} г. недоступны")
-
-        if not all_dfs:
+        years_key = tuple(selected_years)
+        mtimes_key = tuple(get_mtime(WEATHER_DIR / f"weather_data_{year}.csv") for year in years_key)
+        combined_df = _load_combined_weather(years_key, mtimes_key)
+
+        if combined_df.empty:
             logger.info("Нет валидных данных для отображения метеоданных")
             st.info("Нет данных для отображения")
             return
 
-        combined_df = pd.concat(all_dfs, ignore_index=True)
         exclude = ["date", "Год", "ДеньМесяц"]
         available_params = [col for col in combined_df.columns if col not in exclude]
         default_params = ["t", "precipitation", "humidity", "v_max"]
@@ -124,28 +155,12 @@ def render_global_weather():
 
     # Build and display chart
     if y_cols:
-        plot_data = []
-        for col in y_cols:
-            for year in selected_years:
-                year_str = str(year)
-                mask = combined_df["Год"] == year_str
-                if mask.sum() == 0:
-                    continue
-                yearly_avg = combined_df[mask].groupby("ДеньМесяц")[col].mean().reset_index()
-                yearly_avg["Год"] = year_str
-                yearly_avg.rename(columns={col: "Значение"}, inplace=True)
-                yearly_avg["Параметр"] = col
-                plot_data.append(yearly_avg)
-
-        if not plot_data:
+        final_df = _build_daily_averages(years_key, mtimes_key, tuple(y_cols), combined_df)
+        if final_df.empty:
             logger.info("Нет данных для построения графика метеоданных")
             st.info("Нет данных для отображения")
             return
 
-        final_df = pd.concat(plot_data, ignore_index=True)
-        final_df["Дата"] = pd.to_datetime("2020-" + final_df["ДеньМесяц"], errors="coerce")
-        final_df = final_df.dropna(subset=["Дата"]).sort_values("Дата")
-
         # Apply day limit
         max_date = final_df["Дата"].max()
         min_date = max_date - timedelta(days=days)
@@ -5,68 +5,75 @@ Automatically creates the directory and uses daily log files.
 """
 
 import os
+import atexit
 import logging
-from logging.handlers import TimedRotatingFileHandler
+from logging.handlers import TimedRotatingFileHandler, QueueHandler, QueueListener
+from queue import SimpleQueue
 from datetime import datetime
 
 
-class AppLogger:
-    _instance = None
-    _logger = None
+# Configured application logger (created on first call to get_app_logger)
+_LOGGER = None
 
-    def __new__(cls, name="CoalFireApp"):
-        if cls._instance is None:
-            cls._instance = super(AppLogger, cls).__new__(cls)
-            cls._instance._init_logger(name)
-        return cls._instance
+# Background listener that writes queued records to the file and console handlers
+_LISTENER = None
 
-    def _init_logger(self, name: str):
-        """Initializes the logger with file and console handlers."""
-        if self._logger is not None:
-            return
 
-        # Create log directory
-        log_dir = "log"
-        os.makedirs(log_dir, exist_ok=True)
+def _init_logger(name: str) -> logging.Logger:
+    """
+    Initializes the logger. Calling threads only enqueue records; a single
+    QueueListener thread writes them to the file and console handlers.
+    """
+    global _LISTENER
 
-        # Logger setup
-        self._logger = logging.getLogger(name)
-        self._logger.setLevel(logging.INFO)
+    # Create log directory
+    log_dir = "log"
+    os.makedirs(log_dir, exist_ok=True)
 
-        # Avoid duplicate handlers if module is reloaded
-        if self._logger.handlers:
-            return
+    # Logger setup
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+    # Records are handled here only; the root logger would print them a second time
+    logger.propagate = False
 
-        # Formatter
-        formatter = logging.Formatter(
-            fmt="%(asctime)s | %(levelname)-8s | %(name)s | %(funcName)s:%(lineno)d | %(message)s",
-            datefmt="%Y-%m-%d %H:%M:%S"
-        )
+    # Avoid duplicate handlers if module is reloaded
+    if logger.handlers:
+        return logger
 
-        # File handler (rotates daily)
-        log_file = os.path.join(log_dir, "app.log")
-        file_handler = TimedRotatingFileHandler(
-            filename=log_file,
-            when="midnight",
-            interval=1,
-            backupCount=30,  # Keep logs for 30 days
-            encoding="utf-8"
-        )
-        file_handler.setFormatter(formatter)
-        file_handler.suffix = "%Y-%m-%d"  # e.g., app.log.2025-11-24
+    # Formatter
+    formatter = logging.Formatter(
+        fmt="%(asctime)s | %(levelname)-8s | %(name)s | %(funcName)s:%(lineno)d | %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S"
+    )
 
-        # Console handler (optional, can be removed for production)
-        console_handler = logging.StreamHandler()
-        console_handler.setFormatter(formatter)
+    # File handler (rotates daily)
+    log_file = os.path.join(log_dir, "app.log")
+    file_handler = TimedRotatingFileHandler(
+        filename=log_file,
+        when="midnight",
+        interval=1,
+        backupCount=30,  # Keep logs for 30 days
+        encoding="utf-8"
+    )
+    file_handler.setFormatter(formatter)
+    file_handler.suffix = "%Y-%m-%d"  # e.g., app.log.2025-11-24
 
-        # Add handlers
-        self._logger.addHandler(file_handler)
-        self._logger.addHandler(console_handler)
+    # Console handler (optional, can be removed for production)
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(formatter)
 
-    def get_logger(self) -> logging.Logger:
-        return self._logger
+    # Add handlers behind a queue
+    log_queue = SimpleQueue()
+    logger.addHandler(QueueHandler(log_queue))
+    _LISTENER = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    _LISTENER.start()
+    atexit.register(_LISTENER.stop)
+    return logger
 
 
 # Convenience function for easy access
 def get_app_logger(name: str = "CoalFireApp") -> logging.Logger:
-    return AppLogger(name).get_logger()
+    global _LOGGER
+    if _LOGGER is None:
+        _LOGGER = _init_logger(name)
+    return _LOGGER
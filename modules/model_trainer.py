@@ -2,25 +2,27 @@
 """
 Trains and saves a machine learning model for predicting coal stockpile fire risk.
 Automatically aggregates all weather data files matching the pattern:
-`data/weather_data/weather_data_*.csv`.
+`data/weather_data/weather_data_YYYY.csv`.
 
 The pipeline performs the following steps:
 1. Loads historical data on coal supplies, temperature, and fire incidents.
 2. Constructs a daily calendar of coal stockpile states.
 3. Engineers features including stack age, mass, temperature trends, and weather.
 4. Defines a binary target: fire occurrence within the next 3 days.
-5. Trains a class-weighted Random Forest classifier.
+5. Trains a class-weighted histogram gradient boosting classifier.
 6. Saves the model and label encoder to `data/pkl/`.
 
 All file paths are resolved relative to the project root (where `app.py` resides).
 """
 
 import os
-import glob
+import numpy as np
 import pandas as pd
 import joblib
 from .logger import get_app_logger
-from sklearn.ensemble import RandomForestClassifier
+from .data_loader import read_csv_fast, scan_weather_files
+from sklearn import config_context
+from sklearn.ensemble import HistGradientBoostingClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder
 
@@ -28,9 +30,24 @@ from sklearn.preprocessing import LabelEncoder
 logger = get_app_logger()
 
 
+def _dump_atomic(obj, path):
+    """
+    Pickles an object next to `path` and moves it into place with os.replace.
+    The predictor memory-maps model.pkl, so the file must never be rewritten in place:
+    existing mappings keep the old inode and stay valid.
+
+    @param obj: Object to persist.
+    @param path: Target file path.
+    @return None
+    """
+    tmp_path = f"{path}.tmp"
+    joblib.dump(obj, tmp_path, protocol=5)
+    os.replace(tmp_path, path)
+
+
 def train_and_save_model():
     """
-    Trains a Random Forest classifier to predict the risk of coal stockpile self-ignition
+    Trains a histogram gradient boosting classifier to predict the risk of coal stockpile self-ignition
     and saves the trained model along with the LabelEncoder for the 'Марка' feature.
 
     This function:
@@ -40,7 +57,7 @@ def train_and_save_model():
     - Engineers key features (age, mass, temperature change, weather, etc.).
     - Encodes categorical features and handles missing values.
     - Splits data into train/test sets with stratification.
-    - Trains a Random Forest with class weighting to address imbalance.
+    - Trains a HistGradientBoostingClassifier with class weighting to address imbalance.
     - Persists model artifacts to disk.
 
     @raises FileNotFoundError
@@ -63,7 +80,7 @@ def train_and_save_model():
     fires_path = os.path.join(data_dir, "fires", "fires.csv")
     supplies_path = os.path.join(data_dir, "supplies", "supplies.csv")
     temperature_path = os.path.join(data_dir, "temperature", "temperature.csv")
-    weather_pattern = os.path.join(data_dir, "weather_data", "weather_data_*.csv")
+    weather_dir = os.path.join(data_dir, "weather_data")
 
     pkl_dir = os.path.join(data_dir, "pkl")
     model_path = os.path.join(pkl_dir, "model.pkl")
@@ -87,29 +104,38 @@ def train_and_save_model():
     db_temp = pd.read_csv(temperature_path)
     logger.info(f"Loaded datasets — fires: {db_fires.shape}, supplies: {db_supplies.shape}, temperature: {db_temp.shape}")
 
+    # Parse every date column once; the pipeline below works on datetime64 only
+    for db, date_cols in (
+        (db_supplies, ["ВыгрузкаНаСклад", "ПогрузкаНаСудно"]),
+        (db_fires, ["Дата начала", "Дата оконч."]),
+        (db_temp, ["Дата акта"])
+    ):
+        for col in date_cols:
+            db[col] = pd.to_datetime(db[col], errors="coerce")
+
+    # Use one shared categorical dtype for the stockpile key so that all
+    # groupby/merge operations below work on integer codes
+    stack_dtype = pd.CategoricalDtype(sorted(
+        set(db_supplies["Штабель"].dropna())
+        | set(db_fires["Штабель"].dropna())
+        | set(db_temp["Штабель"].dropna())
+    ))
+    for db in (db_supplies, db_fires, db_temp):
+        db["Штабель"] = db["Штабель"].astype(stack_dtype)
+
     # Load all weather files
-    weather_files = glob.glob(weather_pattern)
+    weather_files = scan_weather_files(weather_dir) if os.path.isdir(weather_dir) else []
     if not weather_files:
-        error_msg = f"No weather files found matching pattern: {weather_pattern}"
+        error_msg = f"No weather_data_YYYY.csv files found in: {weather_dir}"
         logger.error(error_msg)
         raise FileNotFoundError(error_msg)
 
-    weather_dfs = []
-    for file in weather_files:
-        df = pd.read_csv(file)
-        df["date"] = pd.to_datetime(df["date"], errors="coerce")
-        weather_dfs.append(df[["date", "t", "p", "humidity"]])
-        logger.debug(f"Loaded weather file: {os.path.basename(file)} ({len(df)} records)")
-
-    weather = pd.concat(weather_dfs, ignore_index=True)
-    logger.info(f"Aggregated total weather records: {len(weather)}")
-
     # Determine temporal boundaries from all data sources
     try:
-        fire_end = pd.to_datetime(db_fires["Дата оконч."], errors='coerce')
-        temp_date = pd.to_datetime(db_temp["Дата акта"], errors='coerce')
-        unload_date = pd.to_datetime(db_supplies["ВыгрузкаНаСклад"], errors='coerce')
-        load_date = pd.to_datetime(db_supplies["ПогрузкаНаСудно"], errors='coerce')
+        fire_end = db_fires["Дата оконч."]
+        temp_date = db_temp["Дата акта"]
+        unload_date = db_supplies["ВыгрузкаНаСклад"]
+        load_date = db_supplies["ПогрузкаНаСудно"]
 
         dates = [
             fire_end.min(), temp_date.min(), unload_date.min(), load_date.min(),
@@ -120,62 +146,81 @@ def train_and_save_model():
             raise ValueError("Unable to infer valid time range from input data")
         min_date = min(valid_dates)
         max_date = max(valid_dates)
-        logger.debug(f"Inferred data time range: {min_date.date()} to {max_date.date()}")
+        logger.debug("Inferred data time range: %s to %s", min_date.date(), max_date.date())
     except Exception as e:
         logger.error(f"Failed to determine temporal boundaries: {e}", exc_info=True)
         raise
 
-    # Build daily calendar per stockpile
-    stack_start = db_supplies.groupby("Штабель")["ВыгрузкаНаСклад"].min()
-    stack_calendars = {}
-    for stack in stack_start.index:
-        start = pd.to_datetime(stack_start[stack], errors='coerce')
-        if pd.isna(start):
-            continue
-        dates_range = pd.date_range(start, max_date, freq="D")
-        stack_calendars[stack] = pd.DataFrame({"Дата": dates_range, "Штабель": stack})
-
-    if not stack_calendars:
+    # Keep only the weather records of the calendar period
+    weather_start = min_date.normalize()
+    weather_dfs = []
+    for _, file in weather_files:
+        df = read_csv_fast(file, usecols=["date", "t", "p", "humidity"], parse_dates=["date"])
+        df = df[df["date"].between(weather_start, max_date)]
+        weather_dfs.append(df)
+        logger.debug("Loaded weather file: %s (%d records)", os.path.basename(file), len(df))
+
+    weather = pd.concat(weather_dfs, ignore_index=True)
+    logger.info(f"Aggregated total weather records: {len(weather)}")
+
+    # Build daily calendar per stockpile: every stockpile spans from its first
+    # unloading to max_date, so the whole frame is assembled with np.repeat
+    stack_start = db_supplies.groupby("Штабель", observed=True)["ВыгрузкаНаСклад"].min().dropna()
+    if stack_start.empty:
         error_msg = "No valid stockpiles found for processing"
         logger.error(error_msg)
         raise ValueError(error_msg)
 
-    df_calendar = pd.concat(list(stack_calendars.values()), ignore_index=True)
-    df_calendar["Дата"] = pd.to_datetime(df_calendar["Дата"]).dt.normalize()
+    one_day = np.timedelta64(1, "D")
+    starts = stack_start.to_numpy()
+    lengths = ((max_date.to_datetime64() - starts) // one_day + 1).astype(np.int64)
+    day_offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    df_calendar = pd.DataFrame({
+        "Дата": np.repeat(starts, lengths) + day_offsets * one_day,
+        "Штабель": pd.Categorical.from_codes(np.repeat(stack_start.index.codes, lengths), dtype=stack_dtype),
+    })
+    df_calendar["Дата"] = df_calendar["Дата"].dt.normalize()
     logger.info(f"Constructed stockpile calendar with {len(df_calendar)} daily records")
 
     # Label high-risk days (fire within next 3 days)
-    df_calendar["y_3d"] = 0
     fires_events = db_fires[["Штабель", "Дата начала"]].dropna()
-    fires_events["Дата начала"] = pd.to_datetime(fires_events["Дата начала"]).dt.normalize()
-
-    fire_count = 0
-    for _, row in fires_events.iterrows():
-        sht = row["Штабель"]
-        fire_date = row["Дата начала"]
-        if pd.isna(sht) or pd.isna(fire_date):
-            continue
-        window_start = fire_date - pd.Timedelta(days=3)
-        window_end = fire_date - pd.Timedelta(days=1)
-        mask = (
-            (df_calendar["Штабель"] == sht) &
-            (df_calendar["Дата"] >= window_start) &
-            (df_calendar["Дата"] <= window_end)
-        )
-        df_calendar.loc[mask, "y_3d"] = 1
-        fire_count += mask.sum()
+    fires_events["Дата начала"] = fires_events["Дата начала"].dt.normalize()
+
+    # A day is at risk if the nearest following window end (fire date - 1 day)
+    # of the same stockpile lies within 2 days, i.e. the fire starts 1-3 days later
+    fire_windows = fires_events.assign(
+        window_end=(fires_events["Дата начала"] - pd.Timedelta(days=1)).astype(df_calendar["Дата"].dtype)
+    ).sort_values("window_end")
+    calendar_sorted = (
+        df_calendar[["Штабель", "Дата"]]
+        .assign(row=np.arange(len(df_calendar)))
+        .sort_values("Дата", kind="stable")
+    )
+    matched = pd.merge_asof(
+        calendar_sorted,
+        fire_windows[["Штабель", "window_end"]],
+        by="Штабель",
+        left_on="Дата",
+        right_on="window_end",
+        direction="forward",
+        tolerance=pd.Timedelta(days=2)
+    )
+    risk_rows = matched.loc[matched["window_end"].notna(), "row"].to_numpy()
+    y_3d = np.zeros(len(df_calendar), dtype=np.int8)
+    y_3d[risk_rows] = 1
+    df_calendar["y_3d"] = y_3d
+    fire_count = len(risk_rows)
 
     logger.info(f"Labeled {fire_count} high-risk days based on {len(fires_events)} fire events")
 
     # Enrich with stockpile metadata
     stack_info = (
         db_supplies
-        .groupby("Штабель")
+        .groupby("Штабель", observed=True)
         .agg({"ВыгрузкаНаСклад": "min", "Наим. ЕТСНГ": "first"})
         .reset_index()
         .rename(columns={"ВыгрузкаНаСклад": "Дата_формирования", "Наим. ЕТСНГ": "Марка"})
     )
-    stack_info["Дата_формирования"] = pd.to_datetime(stack_info["Дата_формирования"])
     df_calendar = df_calendar.merge(stack_info, on="Штабель", how="left")
     df_calendar["Возраст_дн"] = (df_calendar["Дата"] - df_calendar["Дата_формирования"]).dt.days
 
@@ -183,27 +228,32 @@ def train_and_save_model():
     arrivals = db_supplies[["Штабель", "ВыгрузкаНаСклад", "На склад, тн"]].dropna()
     arrivals = arrivals.rename(columns={"ВыгрузкаНаСклад": "Дата", "На склад, тн": "delta_mass"})
     arrivals["delta_mass"] = pd.to_numeric(arrivals["delta_mass"], errors="coerce")
-    arrivals["Дата"] = pd.to_datetime(arrivals["Дата"])
 
     departures = db_supplies[["Штабель", "ПогрузкаНаСудно", "На судно, тн"]].dropna()
     departures = departures.rename(columns={"ПогрузкаНаСудно": "Дата", "На судно, тн": "delta_mass"})
     departures["delta_mass"] = -pd.to_numeric(departures["delta_mass"], errors="coerce")
-    departures["Дата"] = pd.to_datetime(departures["Дата"])
 
     mass_events = pd.concat([arrivals, departures], ignore_index=True).dropna(subset=["delta_mass"])
-    mass_daily = mass_events.groupby(["Штабель", "Дата"])["delta_mass"].sum().reset_index()
-    df_calendar["Дата"] = pd.to_datetime(df_calendar["Дата"])
-    df_calendar = df_calendar.merge(mass_daily, on=["Штабель", "Дата"], how="left")
-    df_calendar["delta_mass"] = df_calendar["delta_mass"].fillna(0)
-    df_calendar["mass"] = df_calendar.groupby("Штабель")["delta_mass"].cumsum()
+    mass_daily = mass_events.groupby(["Штабель", "Дата"], observed=True)["delta_mass"].sum()
+    calendar_keys = pd.MultiIndex.from_frame(df_calendar[["Штабель", "Дата"]])
+    df_calendar["delta_mass"] = mass_daily.reindex(calendar_keys, fill_value=0).to_numpy()
+    df_calendar["mass"] = df_calendar.groupby("Штабель", sort=False, observed=True)["delta_mass"].cumsum()
 
     # Add temperature features
-    db_temp["Дата акта"] = pd.to_datetime(db_temp["Дата акта"])
-    db_temp_grouped = db_temp.groupby(["Штабель", "Дата акта"])["Максимальная температура"].max().reset_index()
+    db_temp_grouped = db_temp.groupby(["Штабель", "Дата акта"], observed=True)["Максимальная температура"].max().reset_index()
     db_temp_grouped.rename(columns={"Дата акта": "Дата"}, inplace=True)
     df_calendar = df_calendar.merge(db_temp_grouped, on=["Штабель", "Дата"], how="left")
-    df_calendar["Максимальная температура"] = df_calendar.groupby("Штабель")["Максимальная температура"].ffill().fillna(0)
-    df_calendar["Темп_изменение"] = df_calendar.groupby("Штабель")["Максимальная температура"].diff().fillna(0)
+    temp_max = df_calendar.groupby("Штабель", sort=False, observed=True)["Максимальная температура"].ffill().fillna(0)
+    df_calendar["Максимальная температура"] = temp_max
+
+    # The calendar is ordered by stockpile and date, so the change is the difference
+    # of neighbouring rows, reset to 0 on the first day of each stockpile
+    temp_values = temp_max.to_numpy()
+    stack_values = df_calendar["Штабель"].cat.codes.to_numpy()
+    temp_change = np.zeros_like(temp_values)
+    temp_change[1:] = temp_values[1:] - temp_values[:-1]
+    temp_change[1:][stack_values[1:] != stack_values[:-1]] = 0
+    df_calendar["Темп_изменение"] = temp_change
 
     # Merge weather data
     df_calendar = df_calendar.merge(weather, left_on="Дата", right_on="date", how="left")
@@ -228,27 +278,37 @@ def train_and_save_model():
     le = LabelEncoder()
     X["Марка"] = le.fit_transform(X["Марка"].astype(str))
 
+    # Downcast features: the model bins its input into 8-bit histograms anyway
+    float_cols = ["mass", "Максимальная температура", "Темп_изменение", "t", "p", "humidity"]
+    X[float_cols] = X[float_cols].astype(np.float32)
+    for col in ["Марка", "Возраст_дн", "weekday", "month"]:
+        X[col] = pd.to_numeric(X[col], downcast="integer")
+
     # Train/test split
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, test_size=0.2, random_state=42, stratify=y
     )
 
     # Train model
-    clf = RandomForestClassifier(
-        n_estimators=200,
-        random_state=42,
+    clf = HistGradientBoostingClassifier(
+        max_iter=300,
+        learning_rate=0.05,
+        max_leaf_nodes=31,
         class_weight={0: 1, 1: 5},
-        max_depth=10,
-        min_samples_leaf=5,
-        max_features="sqrt"
+        early_stopping=True,
+        validation_fraction=0.1,
+        random_state=42
     )
-    clf.fit(X_train, y_train)
+    # Features are already filled and downcast, so skip the finiteness check
+    with config_context(assume_finite=True):
+        clf.fit(X_train, y_train)
     logger.info("Model training completed successfully")
 
     # Save artifacts
     os.makedirs(pkl_dir, exist_ok=True)
-    joblib.dump(clf, model_path)
-    joblib.dump(le, encoder_path)
+    # Stored uncompressed so that the predictor can memory-map the arrays
+    _dump_atomic(clf, model_path)
+    _dump_atomic(le, encoder_path)
 
     logger.info(f"Model saved to: {model_path}")
     logger.info(f"LabelEncoder saved to: {encoder_path}")
@@ -5,13 +5,70 @@ Module for plotting time-series data.
 
 import streamlit as st
 import plotly.express as px
-import plotly.graph_objects as go
 import pandas as pd
 from .logger import get_app_logger  # ← добавлен импорт логгера
 
 # Инициализация логгера
 logger = get_app_logger()
 
+PLOT_TYPES = ("Линейный", "Гистограмма", "Точечный (scatter)")
+
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _build_figure(df_agg, x_col, y_cols, plot_type, title):
+    """
+    Builds a Plotly figure from aggregated data. Cached across reruns, so an unchanged
+    chart is not rebuilt (figure construction runs Plotly validators for every trace).
+
+    @param df_agg: pd.DataFrame
+        Aggregated data with the X column and Y columns.
+    @param x_col: str
+        Name of the X-axis column.
+    @param y_cols: Tuple[str]
+        Y-axis column names.
+    @param plot_type: str
+        One of PLOT_TYPES.
+    @param title: str
+        Plot title.
+    @return: plotly.graph_objects.Figure
+    """
+    # Long format: one trace per metric is created by the `color` argument
+    df_melted = df_agg.melt(id_vars=[x_col], value_vars=list(y_cols), var_name="Метрика", value_name="Значение")
+
+    if plot_type == "Линейный":
+        fig = px.line(
+            df_melted,
+            x=x_col,
+            y="Значение",
+            color="Метрика",
+            title=title,
+            markers=True,
+            render_mode="webgl"
+        )
+
+    elif plot_type == "Гистограмма":
+        fig = px.bar(
+            df_melted,
+            x=x_col,
+            y="Значение",
+            color="Метрика",
+            title=title,
+            barmode="group"
+        )
+
+    else:
+        fig = px.scatter(
+            df_melted,
+            x=x_col,
+            y="Значение",
+            color="Метрика",
+            title=title,
+            render_mode="webgl"
+        )
+
+    fig.update_layout(xaxis_title="Дата", yaxis_title="Значение")
+    return fig
+
 
 def plot_series(
     df,
@@ -46,7 +103,7 @@ def plot_series(
     @param show_back_button: bool
         If True — show "Back to main" button above the chart.
     """
-    logger.debug(f"Запуск построения графика: {title}, тип={plot_type}, дней={days_lookback}")
+    logger.debug("Запуск построения графика: %s, тип=%s, дней=%s", title, plot_type, days_lookback)
 
     if date_col not in df.columns:
         warning_msg = f"Колонка даты '{date_col}' не найдена в данных"
@@ -54,16 +111,25 @@ def plot_series(
         st.warning(warning_msg)
         return
 
+    # Only the plotted columns are carried through date filtering and aggregation
+    df = df[list(dict.fromkeys([date_col, *(col for col in y_cols if col in df.columns)]))].copy()
     df[date_col] = pd.to_datetime(df[date_col], errors='coerce')
-    df = df.dropna(subset=[date_col]).copy()
+    df = df.dropna(subset=[date_col])
     if df.empty:
         logger.info("Нет корректных дат для отображения")
         st.info("Нет корректных дат")
         return
 
-    max_date = df[date_col].max()
-    min_date = max_date - pd.Timedelta(days=days_lookback)
-    df = df[(df[date_col] >= min_date) & (df[date_col] <= max_date)].copy()
+    dates = df[date_col]
+    if dates.is_monotonic_increasing:
+        # Sorted data (see load_csv_tail): the window is a tail slice found by binary search
+        max_date = dates.iloc[-1]
+        min_date = max_date - pd.Timedelta(days=days_lookback)
+        df = df.iloc[dates.searchsorted(min_date, side="left"):].copy()
+    else:
+        max_date = dates.max()
+        min_date = max_date - pd.Timedelta(days=days_lookback)
+        df = df[(dates >= min_date) & (dates <= max_date)].copy()
     if df.empty:
         msg = f"Нет данных за последние {days_lookback} дней (до {max_date.date()})"
         logger.info(msg)
@@ -96,37 +162,14 @@ def plot_series(
         st.warning(warning_msg)
         return
 
-    try:
-        if plot_type == "Линейный":
-            fig = go.Figure()
-            for col in y_cols:
-                fig.add_trace(go.Scatter(x=df_agg[x_col], y=df_agg[col], mode='lines+markers', name=col))
-            fig.update_layout(title=title, xaxis_title="Дата", yaxis_title="Значение")
-
-        elif plot_type == "Гистограмма":
-            df_melted = df_agg.melt(id_vars=[x_col], value_vars=y_cols, var_name="Метрика", value_name="Значение")
-            fig = px.bar(
-                df_melted,
-                x=x_col,
-                y="Значение",
-                color="Метрика",
-                title=title,
-                barmode="group"
-            )
-            fig.update_layout(xaxis_title="Дата", yaxis_title="Значение")
-
-        elif plot_type == "Точечный (scatter)":
-            fig = go.Figure()
-            for col in y_cols:
-                fig.add_trace(go.Scatter(x=df_agg[x_col], y=df_agg[col], mode='markers', name=col))
-            fig.update_layout(title=title, xaxis_title="Дата", yaxis_title="Значение")
-
-        else:
-            warning_msg = f"Неизвестный тип графика: {plot_type}"
-            logger.warning(warning_msg)
-            st.warning(warning_msg)
-            return
+    if plot_type not in PLOT_TYPES:
+        warning_msg = f"Неизвестный тип графика: {plot_type}"
+        logger.warning(warning_msg)
+        st.warning(warning_msg)
+        return
 
+    try:
+        fig = _build_figure(df_agg[[x_col] + y_cols], x_col, tuple(y_cols), plot_type, title)
         st.plotly_chart(fig, use_container_width=True, key=chart_key)
         logger.info(f"График успешно отображён: {title}")
 
@@ -1,8 +1,12 @@
 # modules/predict.py
-import joblib
+import os
+import warnings
+import numpy as np
 import pandas as pd
 import streamlit as st
+from threadpoolctl import threadpool_limits
 from .logger import get_app_logger  # ← добавлен импорт логгера
+from .data_loader import get_mtime
 
 # Инициализация логгера
 logger = get_app_logger()
@@ -10,11 +14,53 @@ logger = get_app_logger()
 MODEL_PATH = "data/pkl/model.pkl"
 LE_PATH = "data/pkl/label_encoder.pkl"
 
+# Rows scored per predict_proba call, bounds the (n, 2) probability buffer
+PREDICT_CHUNK_ROWS = 131072
+
+# Threads per scoring call; concurrent Streamlit sessions would oversubscribe the CPU otherwise
+PREDICT_N_JOBS = int(os.getenv("PREDICTOR_NJOBS", "2"))
+
+
+@st.cache_resource(show_spinner=False)
+def _load_pkl(path: str, mtime, mmap_mode=None):
+    """
+    Deserializes a joblib pickle once per process.
+
+    @param path: Path to the pickle file.
+    @param mtime: File modification time (cache invalidation key).
+    @param mmap_mode: Passed to joblib.load; 'r' memory-maps the NumPy arrays read-only.
+    @return: Loaded object.
+    """
+    # joblib импортируется только при первой загрузке модели
+    import joblib
+
+    return joblib.load(path, mmap_mode=mmap_mode)
+
+
+def _hash_frame(df: pd.DataFrame) -> bytes:
+    """Hashes every cell of a DataFrame (Streamlit samples rows of large frames)."""
+    return pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes()
+
+
+@st.cache_data(show_spinner=False, max_entries=8, hash_funcs={pd.DataFrame: _hash_frame})
+def _predict_proba_cached(_predictor, model_path: str, model_mtime, X: pd.DataFrame):
+    """
+    Caches fire probabilities by the feature matrix contents and the model file.
+
+    @param _predictor: CoalFirePredictor used for scoring (not hashed).
+    @param model_path: Path to the model file (cache key).
+    @param model_mtime: Model file modification time (cache invalidation key).
+    @param X: Prepared feature matrix.
+    @return: Array of fire probabilities.
+    """
+    return _predictor.predict_proba_from_features(X)
+
 
 class CoalFirePredictor:
     def __init__(self, model_path: str = MODEL_PATH, encoder_path: str = LE_PATH):
         self.model = None
         self.encoder = None
+        self._classes = None
         self.model_path = model_path
         self.encoder_path = encoder_path
         self.load_model()
@@ -22,7 +68,9 @@ class CoalFirePredictor:
 
     def load_model(self):
         try:
-            self.model = joblib.load(self.model_path)
+            self.model = _load_pkl(self.model_path, get_mtime(self.model_path), mmap_mode="r")
+            if hasattr(self.model, "n_jobs"):
+                self.model.n_jobs = PREDICT_N_JOBS
             msg = f"Модель загружена: {type(self.model)}"
             logger.info(msg)
             st.write(msg)
@@ -39,7 +87,9 @@ class CoalFirePredictor:
 
     def load_encoder(self):
         try:
-            self.encoder = joblib.load(self.encoder_path)
+            self.encoder = _load_pkl(self.encoder_path, get_mtime(self.encoder_path))
+            # LabelEncoder.classes_ is sorted; as a NumPy string array it can be binary-searched
+            self._classes = np.asarray(self.encoder.classes_).astype(str)
             msg = "LabelEncoder загружен."
             logger.info(msg)
             st.write(msg)
@@ -48,11 +98,13 @@ class CoalFirePredictor:
             logger.warning(warning_msg)
             st.warning("LabelEncoder НЕ загружен. Категория 'Марка' будет факторизована.")
             self.encoder = None
+            self._classes = None
         except Exception as e:
             warning_msg = f"Ошибка загрузки LabelEncoder из {self.encoder_path}: {e}"
             logger.warning(warning_msg, exc_info=True)
             st.warning(f"LabelEncoder НЕ загружен ({e}). Категория 'Марка' будет факторизована.")
             self.encoder = None
+            self._classes = None
 
     def _ensure_model(self):
         if self.model is None:
@@ -61,39 +113,42 @@ class CoalFirePredictor:
             raise ValueError("Модель не загружена")
 
     def prepare_features_from_df(self, df, feature_cols):
-        df = df.copy()
-        missing = [c for c in feature_cols if c not in df.columns]
+        df_cols = set(df.columns)
+        missing = [c for c in feature_cols if c not in df_cols]
         if missing:
             error_msg = f"В DataFrame не хватает колонок: {missing}"
             logger.error(error_msg)
             raise ValueError(error_msg)
 
-        if "Марка" in df.columns:
+        # Column selection already yields a new frame; the input df is never modified
+        X = df[feature_cols]
+        if "Марка" in X.columns:
             if self.encoder is not None:
-                try:
-                    df["Марка"] = self.encoder.transform(df["Марка"])
-                    logger.debug("Марка закодирована с помощью LabelEncoder")
-                except Exception as e:
-                    logger.warning(f"Ошибка при трансформации 'Марка' через LabelEncoder: {e}. Используется fallback.")
-                    df["Марка"] = df["Марка"].apply(
-                        lambda x: self.encoder.transform([x])[0]
-                        if x in self.encoder.classes_
-                        else -1
-                    )
+                # The encoder was fitted on string values; the binary-search position
+                # is the LabelEncoder index, unknown values get -1
+                values = X["Марка"].to_numpy().astype(str)
+                pos = np.searchsorted(self._classes, values).clip(max=len(self._classes) - 1)
+                codes = np.where(self._classes[pos] == values, pos, -1)
+                unknown = int((codes == -1).sum())
+                if unknown:
+                    logger.warning(f"Неизвестные значения 'Марка' в {unknown} записях закодированы как -1")
+                logger.debug("Марка закодирована по классам LabelEncoder")
             else:
-                df["Марка"], _ = pd.factorize(df["Марка"])
+                codes, _ = pd.factorize(X["Марка"])
                 logger.debug("Марка закодирована через pd.factorize (LabelEncoder недоступен)")
+            X = X.assign(Марка=codes)
 
-        X = df[feature_cols].copy()
-        for col in X.columns:
-            if X[col].isna().any():
-                X[col] = X[col].fillna(X[col].mean())
-                logger.debug(f"В колонке '{col}' заполнены пропущенные значения средним")
-        return X
+        na_cols = X.columns[X.isna().any()].tolist()
+        if na_cols:
+            X = X.fillna(X[na_cols].mean(numeric_only=True))
+            logger.debug("В колонках %s заполнены пропущенные значения средним", na_cols)
+
+        # The model is trained on float32 features, so scoring needs no wider type
+        return X.astype(np.float32)
 
     def predict_from_features(self, X):
         self._ensure_model()
-        logger.debug(f"Выполнен вызов predict() для {X.shape[0]} записей")
+        logger.debug("Выполнен вызов predict() для %d записей", X.shape[0])
         return self.model.predict(X)
 
     def predict_proba_from_features(self, X):
@@ -102,27 +157,56 @@ class CoalFirePredictor:
             error_msg = "Модель не поддерживает метод predict_proba"
             logger.error(error_msg)
             raise ValueError(error_msg)
-        proba = self.model.predict_proba(X)[:, 1]
-        logger.debug(f"Получены вероятности для {X.shape[0]} записей")
+        # Order the columns as in training, then score one C-contiguous float32 block
+        feature_names = getattr(self.model, "feature_names_in_", None)
+        if feature_names is not None:
+            X = X.loc[:, list(feature_names)]
+        X_np = np.ascontiguousarray(X.to_numpy(dtype=np.float32))
+
+        proba = np.empty(len(X_np), dtype=np.float64)
+        # Also caps the OpenMP/BLAS pools of models without an n_jobs parameter
+        with threadpool_limits(limits=PREDICT_N_JOBS), warnings.catch_warnings():
+            warnings.filterwarnings("ignore", message="X does not have valid feature names")
+            for start in range(0, len(X_np), PREDICT_CHUNK_ROWS):
+                chunk = X_np[start:start + PREDICT_CHUNK_ROWS]
+                proba[start:start + len(chunk)] = self.model.predict_proba(chunk)[:, 1]
+        logger.debug("Получены вероятности для %d записей", X.shape[0])
         return proba
 
     def add_predictions_to_df(self, df, feature_cols, threshold=0.1):
         logger.info(f"Запущено добавление предсказаний (порог={threshold}) для {len(df)} записей")
         X = self.prepare_features_from_df(df, feature_cols)
-        proba = self.predict_proba_from_features(X)
-        df = df.copy()
-        df["fire_proba"] = proba
-        df["fire_pred"] = (proba >= threshold).astype(int)
-        logger.info(f"Предсказания добавлены: {df['fire_pred'].sum()} записей с высоким риском")
+        proba = _predict_proba_cached(self, self.model_path, get_mtime(self.model_path), X)
+        high_risk = proba >= threshold
+        df = df.assign(fire_proba=proba, fire_pred=high_risk.view(np.int8))
+        logger.info(f"Предсказания добавлены: {np.count_nonzero(high_risk)} записей с высоким риском")
         return df
 
 
 # Ленивая инициализация
 _predictor_instance = None
+_predictor_mtimes = None
 
 def get_predictor():
-    global _predictor_instance
-    if _predictor_instance is None:
+    global _predictor_instance, _predictor_mtimes
+    # A predictor created while the model was being retrained is replaced once the files change
+    mtimes = (get_mtime(MODEL_PATH), get_mtime(LE_PATH))
+    if _predictor_instance is None or mtimes != _predictor_mtimes:
         logger.info("Инициализация ленивого экземпляра CoalFirePredictor")
         _predictor_instance = CoalFirePredictor()
+        _predictor_mtimes = mtimes
     return _predictor_instance
+
+
+def reset_predictor():
+    """
+    Drops the cached predictor and the deserialized pickles, releasing the
+    memory-mapped model file before it is replaced by a retrained one.
+
+    @return: None
+    """
+    global _predictor_instance
+    _predictor_instance = None
+    _load_pkl.clear()
+    _predict_proba_cached.clear()
+    logger.info("Кэш модели сброшен")
@@ -7,25 +7,68 @@ import json
 import os
 import streamlit as st
 from .logger import get_app_logger  # ← используем ваш кастомный логгер
+from .data_loader import get_mtime
 from constants import SCHEDULE_FILE
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Инициализация логгера
 logger = get_app_logger()
 
 
+def _dumps(data) -> bytes:
+    """
+    Serializes graph configurations to indented UTF-8 JSON.
+    Uses orjson when it is installed, otherwise the standard json module.
+
+    @param data: Dictionary containing graph data.
+    @return: Encoded JSON document.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def _loads(raw: bytes):
+    """
+    Parses a JSON document with orjson when it is installed.
+
+    @param raw: Encoded JSON document.
+    @return: Parsed data.
+    """
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
 def load_schedule():
     """
     Loads graph configurations from the schedule file.
+    The parsed result is cached until the file changes.
+
+    @return: Dictionary containing graph data or default structure.
+    """
+    return _load_schedule_cached(get_mtime(SCHEDULE_FILE))
+
+
+@st.cache_data(show_spinner=False)
+def _load_schedule_cached(mtime):
+    """
+    Cached implementation of load_schedule.
 
+    @param mtime: Schedule file modification time (cache invalidation key, None if missing).
     @return: Dictionary containing graph data or default structure.
     """
-    if os.path.exists(SCHEDULE_FILE):
+    if mtime is not None:
         try:
-            with open(SCHEDULE_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
+            with open(SCHEDULE_FILE, "rb") as f:
+                data = _loads(f.read())
             logger.info("Настройки графиков успешно загружены из schedule.json")
             return data
-        except json.JSONDecodeError as e:
+        except json.JSONDecodeError as e:  # orjson.JSONDecodeError is a subclass
             error_msg = f"Некорректный формат JSON в schedule.json: {e}"
             logger.error(error_msg, exc_info=True)
             st.warning("Не удалось загрузить сохранённые графики: повреждён файл конфигурации")
@@ -52,8 +95,11 @@ def save_schedule(data):
     @param data: Dictionary containing graph data to save.
     """
     try:
-        with open(SCHEDULE_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        # Write to a temporary file first so that a crash never leaves a truncated schedule.json
+        tmp_file = SCHEDULE_FILE.with_name(SCHEDULE_FILE.name + ".tmp")
+        with open(tmp_file, "wb") as f:
+            f.write(_dumps(data))
+        os.replace(tmp_file, SCHEDULE_FILE)
         logger.info("Настройки графиков успешно сохранены в schedule.json")
     except PermissionError:
         error_msg = "Нет прав на запись в файл schedule.json"
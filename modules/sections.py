@@ -6,10 +6,45 @@ All UI text is in Russian.
 """
 
 import streamlit as st
-from modules.data_loader import load_csv
+from modules.data_loader import load_csv_tail
 from modules.plotter import plot_series
-from modules.config_forms import _persist_changes
-import logging
+from modules.config_forms import _mark_dirty
+from modules.logger import get_app_logger
+
+logger = get_app_logger()
+
+
+@st.fragment
+def _render_card(section_key: str, cfg: dict, df):
+    """
+    Renders one chart card with its delete button.
+    Runs as a fragment, so interacting with a card reruns only that card.
+
+    @param section_key: Internal key of the section the chart belongs to.
+    @param cfg: Chart configuration.
+    @param df: Loaded data for the chart.
+    @return: None
+    """
+    if df.empty:
+        st.warning("Данные не загружены.")
+        return
+
+    plot_series(
+        df=df,
+        date_col=cfg["date_col"],
+        y_cols=cfg["y_cols"],
+        days_lookback=cfg["days"],
+        title=cfg["title"],
+        plot_type=cfg["plot_type"],
+        chart_key=f"chart_{section_key}_{cfg['id']}"
+    )
+    if st.button("Удалить", key=f"del_{section_key}_{cfg['id']}"):
+        del st.session_state.graphs[section_key][cfg["id"]]
+        st.session_state.total_graphs -= 1
+        _mark_dirty()
+        logger.info(f"Удалён график ID {cfg['id']} из {section_key}")
+        # The whole app reruns so that the section layout and schedule.json are updated
+        st.rerun()
 
 
 def render_section(section_key: str, section_title: str):
@@ -22,30 +57,16 @@ def render_section(section_key: str, section_title: str):
     """
     st.markdown(f"## {section_title}")
     if st.session_state.graphs[section_key]:
-        plots = st.session_state.graphs[section_key]
-        for i in range(0, len(plots), 2):
-            cols = st.columns(2)
-            for j, cfg in enumerate(plots[i:i+2]):
-                with cols[j]:
-                    df = load_csv(cfg["file"])
-                    if not df.empty:
-                        plot_series(
-                            df=df,
-                            date_col=cfg["date_col"],
-                            y_cols=cfg["y_cols"],
-                            days_lookback=cfg["days"],
-                            title=cfg["title"],
-                            plot_type=cfg["plot_type"],
-                            chart_key=f"chart_{section_key}_{cfg['id']}"
-                        )
-                        if st.button("Удалить", key=f"del_{section_key}_{cfg['id']}"):
-                            st.session_state.graphs[section_key] = [
-                                g for g in st.session_state.graphs[section_key] if g["id"] != cfg["id"]
-                            ]
-                            _persist_changes()
-                            logging.info(f"Удалён график ID {cfg['id']} из {section_key}")
-                            st.rerun()
-                    else:
-                        st.warning("Данные не загружены.")
+        plots = list(st.session_state.graphs[section_key].values())
+        # Charts over the same file and period share one loaded frame
+        frames = {
+            key: load_csv_tail(*key)
+            for key in {(cfg["file"], cfg["days"], cfg["date_col"]) for cfg in plots}
+        }
+        # One two-column layout; charts alternate between the columns
+        cols = st.columns(2)
+        for i, cfg in enumerate(plots):
+            with cols[i % 2]:
+                _render_card(section_key, cfg, frames[(cfg["file"], cfg["days"], cfg["date_col"])])
     else:
         st.info("Нет графиков. Нажмите кнопку выше для создания.")
@@ -7,70 +7,86 @@ All displayed text is in Russian.
 import streamlit as st
 import os
 import datetime
+import functools
 from .logger import get_app_logger  # ← добавлен импорт логгера
 from .global_weather import render_global_weather
 from .config_forms import (
     show_supplies_dialog,
     show_fires_dialog,
     show_temperature_dialog,
-    show_weather_dialog
+    show_weather_dialog,
+    flush_pending_changes
 )
 from .sections import render_section
 from .schedule_manager import load_schedule
-from constants import DATA_DIR
+from constants import DATA_DIR, STYLE_FILE
 from .add_weather_file import handle_add_weather_file
 from .add_predict_file import show_prediction_requirements, handle_predict_file_upload
-from .generate_report import (
-    generate_comprehensive_report,
-    run_prediction_and_generate_report
-)
-from .model_trainer import train_and_save_model
+from .data_loader import get_mtime
 
 # Инициализация логгера
 logger = get_app_logger()
 
 
+def _count_csv_files(dir_path):
+    """
+    Counts the CSV files in a directory tree.
+    The result is cached until the directory or one of its direct subdirectories changes.
+
+    @param dir_path: Root directory.
+    @return: Number of .csv files (0 if the directory is missing).
+    """
+    try:
+        with os.scandir(dir_path) as entries:
+            subdirs = [entry.path for entry in entries if entry.is_dir(follow_symlinks=False)]
+    except OSError:
+        return 0
+    mtimes = tuple(get_mtime(path) for path in [dir_path, *subdirs])
+    return _count_csv_files_cached(str(dir_path), mtimes)
+
+
+@st.cache_data(show_spinner=False)
+def _count_csv_files_cached(dir_path, mtimes):
+    """
+    Cached implementation of _count_csv_files.
+
+    @param dir_path: Root directory.
+    @param mtimes: Modification times of the root and its subdirectories (cache key).
+    @return: Number of .csv files.
+    """
+    count = 0
+    pending = [dir_path]
+    while pending:
+        with os.scandir(pending.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                elif entry.name.endswith(".csv"):
+                    count += 1
+    return count
+
+
+@functools.lru_cache(maxsize=1)
+def _load_app_css():
+    """
+    Reads the application stylesheet once per process.
+
+    @return: CSS text or empty string if the file cannot be read.
+    """
+    try:
+        return STYLE_FILE.read_text(encoding="utf-8")
+    except OSError as e:
+        logger.warning(f"Не удалось загрузить стили {STYLE_FILE}: {e}")
+        return ""
+
+
 def render_header():
     """Renders the main header with date, metrics, and action buttons (with gradient styling)."""
-    st.markdown("""
-    <style>
-    body {
-        background-color: #f5f5f5;
-        color: #333333;
-        font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-    }
-    .stButton > button {
-        background: linear-gradient(to bottom right, #4a90e2, #7fbaf5) !important;
-        color: white !important;
-        border: none;
-        border-radius: 6px;
-        font-weight: 600;
-        padding: 8px 16px;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.15);
-        width: 100%;
-    }
-    .stButton > button:hover {
-        background: linear-gradient(to bottom right, #3a7bc8, #6aa5d9) !important;
-        box-shadow: 0 3px 6px rgba(0,0,0,0.2) !important;
-    }
-    .header-container {
-        background: linear-gradient(to bottom right, #4a90e2, #7fbaf5);
-        color: white;
-        border-radius: 12px;
-        padding: 28px;
-        margin-bottom: 24px;
-        box-shadow: 0 4px 8px rgba(0,0,0,0.2);
-    }
-    </style>
-    """, unsafe_allow_html=True)
+    st.markdown(f"<style>{_load_app_css()}</style>", unsafe_allow_html=True)
 
     now = datetime.datetime.now()
-    all_files = []
-    for root, _, files in os.walk(DATA_DIR):
-        for f in files:
-            if f.endswith(".csv"):
-                all_files.append(f)
-    total_graphs = sum(len(v) for v in st.session_state.graphs.values())
+    csv_count = _count_csv_files(DATA_DIR)
+    total_graphs = st.session_state.total_graphs
 
     st.markdown(
         f"""
@@ -82,7 +98,7 @@ def render_header():
                 {now.strftime("%d.%m.%Y %H:%M")}
             </div>
             <div style="font-size: 1em; opacity: 0.95;">
-                CSV-файлов: {len(all_files)} &nbsp; • &nbsp; Создано графиков: {total_graphs}
+                CSV-файлов: {csv_count} &nbsp; • &nbsp; Создано графиков: {total_graphs}
             </div>
         </div>
         """,
@@ -140,6 +156,11 @@ def render_header():
     elif model_btn:
         try:
             logger.info("Запущено переобучение модели")
+            # Импорт откладывается, чтобы не загружать sklearn при старте
+            from .model_trainer import train_and_save_model
+            from .predict import reset_predictor
+            # Release the memory-mapped model before its file is replaced
+            reset_predictor()
             train_and_save_model()
             st.sidebar.success("Модель успешно пересоздана!")
             logger.info("Модель успешно пересоздана")
@@ -197,15 +218,16 @@ def render_main_tabs():
 
 def render_app():
     logger.info("Запуск основного UI приложения")
-    if "initialized" not in st.session_state:
+    if not st.session_state.get("initialized"):
         saved = load_schedule()
+        # Graphs are indexed by id for O(1) lookup and deletion
         st.session_state.graphs = {
-            "supplies": saved.get("supplies", []),
-            "fires": saved.get("fires", []),
-            "temperature": saved.get("temperature", []),
-            "weather": saved.get("weather", [])
+            category: {g["id"]: g for g in saved.get(category, [])}
+            for category in ("supplies", "fires", "temperature", "weather")
         }
         st.session_state.next_id = saved.get("next_id", 0)
+        # Kept up to date by the create/delete handlers instead of being recounted on every rerun
+        st.session_state.total_graphs = sum(len(v) for v in st.session_state.graphs.values())
         st.session_state.initialized = True
         logger.debug("Состояние приложения инициализировано из schedule.json")
 
@@ -216,23 +238,28 @@ def render_app():
         "trigger_report",
         "trigger_prediction"
     ]:
-        if flag not in st.session_state:
-            st.session_state[flag] = False
-
-    render_header()
-
-    if st.session_state.show_upload_weather:
-        handle_add_weather_file()
-    elif st.session_state.show_upload_predict:
-        show_prediction_requirements()
-        handle_predict_file_upload()
-    elif st.session_state.trigger_report:
-        generate_comprehensive_report()
-    elif st.session_state.trigger_prediction:
-        run_prediction_and_generate_report()
-    else:
-        render_instructions()
-        render_global_weather()
-        render_buttons()
-        st.divider()
-        render_main_tabs()
+        st.session_state.setdefault(flag, False)
+
+    try:
+        render_header()
+
+        if st.session_state.show_upload_weather:
+            handle_add_weather_file()
+        elif st.session_state.show_upload_predict:
+            show_prediction_requirements()
+            handle_predict_file_upload()
+        elif st.session_state.trigger_report:
+            from .generate_report import generate_comprehensive_report
+            generate_comprehensive_report()
+        elif st.session_state.trigger_prediction:
+            from .generate_report import run_prediction_and_generate_report
+            run_prediction_and_generate_report()
+        else:
+            render_instructions()
+            render_global_weather()
+            render_buttons()
+            st.divider()
+            render_main_tabs()
+    finally:
+        # Graph changes made during this run are written to schedule.json in one go
+        flush_pending_changes()
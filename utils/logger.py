@@ -5,7 +5,10 @@ Logger setup module for the application.
 Ensures compatibility with Python < 3.9 by avoiding 'encoding' in basicConfig.
 """
 
+import atexit
 import logging
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from queue import SimpleQueue
 
 # Create a logger instance
 logger = logging.getLogger(__name__)
@@ -13,7 +16,14 @@ logger.setLevel(logging.INFO)
 
 # Prevent adding multiple handlers if module is reloaded
 if not logger.handlers:
-    file_handler = logging.FileHandler('app.log', encoding='utf-8')
+    # Size-bounded log file: 10 MB per file, 3 backups
+    file_handler = RotatingFileHandler('app.log', maxBytes=10_000_000, backupCount=3, encoding='utf-8')
     formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
     file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
+
+    # Callers only enqueue records; a background listener thread writes them to the file
+    log_queue = SimpleQueue()
+    logger.addHandler(QueueHandler(log_queue))
+    listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)